@@ -29,7 +29,6 @@ except ImportError:
     print("Error: Unable to import modules. Make sure all files are in the same directory.")
     sys.exit(1)
 
-
 def format_output(questions: dict, document_name: str) -> str:
     """
     Format questions as plain text output
@@ -167,15 +166,18 @@ Requirements:
         
         # Chunk if necessary (silent processing)
         chunker = TextChunker(max_tokens=args.max_tokens)
-        chunks = chunker.chunk_text(document_text)
-        
+
         # Generate Questions (silent processing)
         generator = QuestionGenerator()
-        
-        if len(chunks) == 1:
+
+        # Exact token count (tiktoken) when available lets documents
+        # that truly fit the budget skip chunking entirely
+        if chunker.estimate_tokens(document_text) <= args.max_tokens:
             questions = generator.generate_from_text(document_text)
         else:
-            questions = generator.generate_from_chunks(chunks)
+            # Stream chunks straight into the API submission queue so
+            # the first requests go out while chunking is still running
+            questions = generator.generate_from_chunks(chunker.iter_chunks(document_text))
         
         # Format and Output
         output_text = format_output(questions, input_path.name)
@@ -4,7 +4,9 @@ LLM-powered question generation from documents using Groq API
 """
 
 import os
-from typing import List, Dict
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List
 
 try:
     from groq import Groq
@@ -12,6 +14,22 @@ except ImportError:
     Groq = None
 
 
+# Numbered/bulleted question line: strips the "1." / "2)" / "-" enumerator
+# and captures the question body (6+ chars, starting at non-space so
+# backtracking cannot hand whitespace back to the capture) in one match
+_QUESTION_RE = re.compile(r'^(?:\d+[.)]|-)\s*(\S.{5,}?)\s*$')
+
+# Maximum concurrent API requests when processing chunks
+_MAX_CONCURRENT_REQUESTS = 8
+
+# Jaccard similarity above which two questions count as duplicates
+_SIMILARITY_THRESHOLD = 0.7
+
+# Word tokens for duplicate detection: punctuation-free, so
+# "What is X?" and "What is X." produce identical token sets
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+
 class QuestionGenerator:
     """Generate questions from document text using Groq (Llama 3.3)"""
     
@@ -114,21 +132,17 @@ Now generate the questions following the format above:"""
         factual_lines = factual_part.strip().split('\n')
         
         for line in factual_lines:
-            line = line.strip()
-            if line and (line[0].isdigit() or line.startswith('-')):
-                question = line.split('.', 1)[-1].split(')', 1)[-1].strip()
-                if question and len(question) > 5:
-                    questions['factual'].append(question)
-        
+            match = _QUESTION_RE.match(line.strip())
+            if match:
+                questions['factual'].append(match.group(1))
+
         # Extract conceptual questions
         conceptual_lines = conceptual_section.strip().split('\n')
-        
+
         for line in conceptual_lines:
-            line = line.strip()
-            if line and (line[0].isdigit() or line.startswith('-')):
-                question = line.split('.', 1)[-1].split(')', 1)[-1].strip()
-                if question and len(question) > 5:
-                    questions['conceptual'].append(question)
+            match = _QUESTION_RE.match(line.strip())
+            if match:
+                questions['conceptual'].append(match.group(1))
         
         return questions
     
@@ -169,13 +183,16 @@ Now generate the questions following the format above:"""
         except Exception as e:
             raise Exception(f"Error generating questions: {str(e)}")
     
-    def generate_from_chunks(self, chunks: List[str]) -> Dict[str, List[str]]:
+    def generate_from_chunks(self, chunks: Iterable[str]) -> Dict[str, List[str]]:
         """
         Generate questions from multiple chunks and combine them
-        
+
         Args:
-            chunks: List of document chunks
-            
+            chunks: Document chunks; may be any iterable, including a
+                generator, in which case each request is submitted as
+                soon as its chunk is produced so chunking overlaps with
+                the API calls
+
         Returns:
             Combined dictionary of questions
         """
@@ -183,11 +200,22 @@ Now generate the questions following the format above:"""
             'factual': [],
             'conceptual': []
         }
-        
-        for i, chunk in enumerate(chunks, 1):
-            # Silent processing
-            questions = self.generate_from_text(chunk, i, len(chunks))
-            
+
+        # Known only for sized inputs; lazy chunk streams omit the
+        # "chunk i of N" note in the prompt
+        total_chunks = len(chunks) if hasattr(chunks, '__len__') else None
+        max_workers = min(total_chunks or _MAX_CONCURRENT_REQUESTS, _MAX_CONCURRENT_REQUESTS)
+
+        # Each chunk is an independent, I/O-bound API call: fire them
+        # concurrently and collect results in chunk order
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(self.generate_from_text, chunk, i, total_chunks)
+                for i, chunk in enumerate(chunks, 1)
+            ]
+            results = [future.result() for future in futures]
+
+        for questions in results:
             all_questions['factual'].extend(questions['factual'])
             all_questions['conceptual'].extend(questions['conceptual'])
         
@@ -203,13 +231,22 @@ Now generate the questions following the format above:"""
     
     def _remove_duplicates(self, questions: List[str]) -> List[str]:
         """Remove duplicate or very similar questions"""
-        seen = set()
         unique = []
-        
+        kept_tokens = []
+
         for q in questions:
-            normalized = q.lower().strip().rstrip('?')
-            if normalized not in seen:
-                seen.add(normalized)
+            tokens = set(_TOKEN_RE.findall(q.lower()))
+            if not tokens:
+                continue
+
+            # Near-duplicate if token overlap with any kept question is high
+            is_duplicate = any(
+                len(tokens & kept) / len(tokens | kept) > _SIMILARITY_THRESHOLD
+                for kept in kept_tokens
+            )
+
+            if not is_duplicate:
+                kept_tokens.append(tokens)
                 unique.append(q)
-        
+
         return unique
\ No newline at end of file
@@ -3,8 +3,202 @@ text_chunker.py
 Intelligently chunks text to fit within LLM token limits
 """
 
+import functools
+import io
 import re
-from typing import List
+import sys
+from typing import Callable, Iterator, List, Tuple
+
+# Optional: exact token counting (falls back to a character estimate)
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+if tiktoken is not None:
+    try:
+        _ENCODING = tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        _ENCODING = None
+else:
+    _ENCODING = None
+
+
+# Optional: Google's RE2 (linear-time, no backtracking) for scan-heavy
+# sentence splitting on large documents
+try:
+    import re2
+except ImportError:
+    re2 = None
+
+# Optional: frequency-based eviction for the per-instance chunk cache
+# (falls back to a plain dict with FIFO eviction)
+try:
+    from cachetools import LFUCache
+except ImportError:
+    LFUCache = None
+
+# Sentence boundaries: ./!/? followed by whitespace, compiled once at
+# import instead of per _split_long_paragraph call. RE2 has no
+# lookbehind, so the punctuation stays inside the match and
+# _split_long_paragraph slices around it instead of using split()
+_SENTENCE_BOUNDARY = (re2 or re).compile(r'[.!?]\s+')
+
+# ASCII fast path for the boundary scan: translate maps punctuation to
+# \x01 and whitespace to \x02 in one C pass, so every sentence boundary
+# is a literal b'\x01\x02' locatable with bytes.find. The whitespace set
+# mirrors what \s matches over ASCII text.
+_ASCII_WHITESPACE = b' \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f'
+_BOUNDARY_TABLE = bytes(
+    1 if c in b'.!?' else 2 if c in _ASCII_WHITESPACE else 0
+    for c in range(256)
+)
+_BOUNDARY_NEEDLE = b'\x01\x02'
+
+
+def _iter_paragraphs(text: str) -> Iterator[str]:
+    """
+    Yield paragraphs one at a time as slices of the original text
+
+    Streaming replacement for splitting the whole document upfront:
+    nothing beyond the current slice is materialized, so peak memory
+    stays proportional to a paragraph rather than the document. Only
+    the edge pieces need trimming - the boundary pattern already
+    absorbs whitespace around interior breaks. May yield empty pieces;
+    callers skip them.
+    """
+    start = 0
+    for match in _PARA_SPLIT.finditer(text):
+        piece = text[start:match.start()]
+        yield piece.strip() if start == 0 else piece
+        start = match.end()
+    tail = text[start:]
+    yield tail.strip() if start == 0 else tail.rstrip()
+
+
+def _iter_paragraph_spans(text: str) -> Iterator[Tuple[int, int]]:
+    """
+    Span twin of _iter_paragraphs: yield (start, end) offsets per
+    paragraph without slicing. Spans are untrimmed; callers shrink
+    whitespace edges themselves.
+    """
+    start = 0
+    for match in _PARA_SPLIT.finditer(text):
+        yield start, match.start()
+        start = match.end()
+    yield start, len(text)
+
+
+def _iter_sentence_spans(paragraph: str) -> Iterator[Tuple[int, int]]:
+    """Yield (start, end) sentence spans at [.!?]+whitespace, punctuation kept"""
+    start = 0
+
+    if paragraph.isascii():
+        # Two linear C passes (translate + repeated find) instead of
+        # the regex engine walking the text character by character
+        marks = paragraph.encode('ascii').translate(_BOUNDARY_TABLE)
+        find = marks.find
+        length = len(marks)
+        i = find(_BOUNDARY_NEEDLE)
+        while i != -1:
+            yield start, i + 1
+            j = i + 2
+            while j < length and marks[j] == 2:
+                j += 1
+            start = j
+            i = find(_BOUNDARY_NEEDLE, j)
+    else:
+        for match in _SENTENCE_BOUNDARY.finditer(paragraph):
+            yield start, match.start() + 1
+            start = match.end()
+
+    yield start, len(paragraph)
+
+
+def _split_sentences(paragraph: str) -> List[str]:
+    """Split into sentences at [.!?]+whitespace, punctuation kept"""
+    return [paragraph[s:e] for s, e in _iter_sentence_spans(paragraph)]
+
+# Paragraph boundaries: a blank line, with surrounding whitespace absorbed
+# into the separator so split pieces come out already trimmed
+_PARA_SPLIT = re.compile(r'[ \t]*\n[ \t]*\n\s*')
+
+# Documents kept in the per-instance chunk_text result cache
+_CHUNK_CACHE_SIZE = 32
+
+
+def _specialize_paragraph_chunker(
+    max_chars: int,
+    split_long_paragraph: Callable[[str], List[str]],
+) -> Callable[[str], Iterator[str]]:
+    """
+    Build a paragraph-chunk generator with a fixed budget baked in
+
+    max_chars never changes after __init__, so partial evaluation turns
+    the per-call bindings into default arguments the bytecode reads with
+    LOAD_FAST - no self lookups anywhere in the hot loop.
+    """
+    def iter_paragraph_chunks(text, max_chars=max_chars,
+                              split_long_paragraph=split_long_paragraph,
+                              StringIO=io.StringIO, intern=sys.intern,
+                              iter_paragraphs=_iter_paragraphs):
+        # Accumulate each chunk in a single write-only buffer instead of a
+        # list that gets joined and discarded per chunk. The buffer always
+        # ends with the '\n\n' separator, trimmed at emission.
+        buf = StringIO()
+        buf_length = 0   # total paragraph chars in the buffer (no separators)
+        last_para = None  # kept for overlap across chunk boundaries
+        last_length = 0
+        write = buf.write
+
+        # filter(None, ...) drops the empty pieces the paragraph
+        # iterator may yield without a per-iteration Python-level test
+        for para in filter(None, iter_paragraphs(text)):
+            # Repeated boilerplate paragraphs (running headers, section
+            # titles) collapse to one shared heap object, and interned
+            # strings hash by identity in the estimator's cache
+            para = intern(para)
+
+            para_length = len(para)
+
+            # If single paragraph exceeds limit, split by sentences
+            if para_length > max_chars:
+                # Emit current chunk if any
+                if buf_length:
+                    yield buf.getvalue()[:-2]
+                    buf = StringIO()
+                    write = buf.write
+                    buf_length = 0
+                    last_para = None
+
+                # Split long paragraph
+                yield from split_long_paragraph(para)
+                continue
+
+            # Check if adding this paragraph exceeds limit. A non-empty
+            # buffer is implied: para_length <= max_chars here (the
+            # oversized case continued above), so the sum can only
+            # overflow when buf_length > 0.
+            if buf_length + para_length > max_chars:
+                yield buf.getvalue()[:-2]
+                # Start the next chunk with the previous paragraph as overlap
+                buf = StringIO()
+                write = buf.write
+                write(last_para)
+                write('\n\n')
+                buf_length = last_length
+
+            write(para)
+            write('\n\n')
+            buf_length += para_length
+            last_para = para
+            last_length = para_length
+
+        # Emit remaining chunk
+        if buf_length:
+            yield buf.getvalue()[:-2]
+
+    return iter_paragraph_chunks
 
 
 class TextChunker:
@@ -22,79 +216,89 @@ class TextChunker:
         self.overlap = overlap
         self.max_chars = max_tokens * 4  # Rough approximation
         self.overlap_chars = overlap * 4
+        # Pipelines re-chunk the same document repeatedly; cache whole
+        # results keyed on the text (LFU when cachetools is installed)
+        if LFUCache is not None:
+            self._chunk_cache = LFUCache(maxsize=_CHUNK_CACHE_SIZE)
+        else:
+            self._chunk_cache = {}
+        # Specialized chunking generator with this instance's budget
+        # baked in (see _specialize_paragraph_chunker)
+        self._iter_paragraph_chunks = _specialize_paragraph_chunker(
+            self.max_chars, self._split_long_paragraph)
     
-    def estimate_tokens(self, text: str) -> int:
-        """Estimate token count (rough approximation)"""
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def estimate_tokens(text: str) -> int:
+        """
+        Estimate token count
+
+        Exact via tiktoken when installed, otherwise a rough character
+        approximation. Cached: the same document/chunk strings get
+        measured repeatedly (chunk_text, get_chunk_info, caller code),
+        which matters more now that a real tokenizer may be behind it.
+        """
+        if _ENCODING is not None:
+            return len(_ENCODING.encode(text))
         return len(text) // 4
     
     def chunk_by_paragraphs(self, text: str) -> List[str]:
         """Chunk text by paragraphs while respecting token limits"""
-        paragraphs = text.split('\n\n')
-        chunks = []
-        current_chunk = []
+        return list(self._iter_paragraph_chunks(text))
+
+    def _split_long_paragraph(self, paragraph: str) -> List[str]:
+        """Split a long paragraph by sentences"""
+        chunks: List[str] = []
+        current_chunk: List[str] = []
         current_length = 0
-        
-        for para in paragraphs:
-            para = para.strip()
-            if not para:
-                continue
-            
-            para_length = len(para)
-            
-            # If single paragraph exceeds limit, split by sentences
-            if para_length > self.max_chars:
-                # Save current chunk if any
+        last_length = 0  # length of the last appended sentence
+
+        # Same local-binding treatment as the paragraph loop
+        max_chars = self.max_chars
+        append_chunk = chunks.append
+        # Window stride for unbreakable oversized sentences
+        window_step = max_chars - self.overlap_chars
+        if window_step <= 0:
+            window_step = max_chars
+
+        # map/filter run the strip and the empty test in C, so the loop
+        # body only ever sees real sentences
+        for sentence in filter(None, map(str.strip, _split_sentences(paragraph))):
+            sentence_length = len(sentence)
+
+            # A single unbreakable "sentence" (long URL, code, text with
+            # no punctuation) would overflow any chunk it lands in and
+            # get rejected downstream: hard-split it into budget-sized
+            # windows, stepped to preserve the configured overlap
+            if sentence_length > max_chars:
                 if current_chunk:
-                    chunks.append('\n\n'.join(current_chunk))
+                    append_chunk(' '.join(current_chunk))
                     current_chunk = []
                     current_length = 0
-                
-                # Split long paragraph
-                sentence_chunks = self._split_long_paragraph(para)
-                chunks.extend(sentence_chunks)
-                continue
-            
-            # Check if adding this paragraph exceeds limit
-            if current_length + para_length > self.max_chars and current_chunk:
-                chunks.append('\n\n'.join(current_chunk))
-                # Add overlap from previous chunk
-                current_chunk = [current_chunk[-1]] if current_chunk else []
-                current_length = len(current_chunk[0]) if current_chunk else 0
-            
-            current_chunk.append(para)
-            current_length += para_length
-        
-        # Add remaining chunk
-        if current_chunk:
-            chunks.append('\n\n'.join(current_chunk))
-        
-        return chunks
-    
-    def _split_long_paragraph(self, paragraph: str) -> List[str]:
-        """Split a long paragraph by sentences"""
-        sentences = re.split(r'(?<=[.!?])\s+', paragraph)
-        chunks = []
-        current_chunk = []
-        current_length = 0
-        
-        for sentence in sentences:
-            sentence = sentence.strip()
-            if not sentence:
+                i = 0
+                while True:
+                    append_chunk(sentence[i:i + max_chars])
+                    if i + max_chars >= sentence_length:
+                        break
+                    i += window_step
                 continue
-            
-            sentence_length = len(sentence)
-            
-            if current_length + sentence_length > self.max_chars and current_chunk:
-                chunks.append(' '.join(current_chunk))
-                # Keep last sentence for overlap
-                current_chunk = [current_chunk[-1]] if current_chunk else []
-                current_length = len(current_chunk[0]) if current_chunk else 0
-            
+
+            # Single comparison: sentence_length <= max_chars here, so
+            # overflow implies current_chunk is non-empty
+            if current_length + sentence_length > max_chars:
+                append_chunk(' '.join(current_chunk))
+                # Keep last sentence for overlap; the guard above already
+                # ensures current_chunk is non-empty, and its length is
+                # still in last_length
+                current_chunk = [current_chunk[-1]]
+                current_length = last_length
+
             current_chunk.append(sentence)
             current_length += sentence_length
+            last_length = sentence_length
         
         if current_chunk:
-            chunks.append(' '.join(current_chunk))
+            append_chunk(' '.join(current_chunk))
         
         return chunks
     
@@ -108,25 +312,170 @@ class TextChunker:
         Returns:
             List of text chunks
         """
-        estimated_tokens = self.estimate_tokens(text)
-        
-        # If text fits within limit, return as single chunk
-        if estimated_tokens <= self.max_tokens:
+        # hash(text) instead of the text itself keeps the key small;
+        # the length guards against hash collisions between documents
+        key = (hash(text), len(text))
+        cached = self._chunk_cache.get(key)
+        if cached is not None:
+            # Copy so a caller mutating its list cannot corrupt the
+            # cached result; a shallow copy is cheap next to re-chunking
+            return list(cached)
+
+        chunks = list(self.iter_chunks(text))
+
+        if LFUCache is None and len(self._chunk_cache) >= _CHUNK_CACHE_SIZE:
+            # FIFO eviction: drop the oldest insertion
+            del self._chunk_cache[next(iter(self._chunk_cache))]
+        self._chunk_cache[key] = chunks
+
+        return list(chunks)
+
+    def chunk_text_views(self, text: str) -> List[Tuple[int, int]]:
+        """
+        Chunk without copying: (start, end) offsets into text, one per chunk
+
+        For callers that only hash, measure, or lazily slice chunks,
+        views skip materializing every chunk string - O(1) memory per
+        chunk instead of O(max_chars). Each view is one contiguous
+        region of the document, so unlike chunk_text the original
+        whitespace between paragraphs and sentences is preserved
+        rather than normalized.
+        """
+        if len(text) <= self.max_chars:
+            return [(0, len(text))]
+
+        views: List[Tuple[int, int]] = []
+        append = views.append
+        max_chars = self.max_chars
+
+        start = 0
+        end = 0
+        length = 0       # content chars in the open chunk (no separators)
+        last_start = 0   # previous paragraph span, kept for overlap
+        last_length = 0
+
+        for ps, pe in _iter_paragraph_spans(text):
+            # Shrink whitespace edges (the span twin of strip())
+            while ps < pe and text[ps].isspace():
+                ps += 1
+            while pe > ps and text[pe - 1].isspace():
+                pe -= 1
+            if ps == pe:
+                continue
+
+            para_length = pe - ps
+
+            if para_length > max_chars:
+                if length:
+                    append((start, end))
+                    length = 0
+                views.extend(self._long_paragraph_views(text, ps, pe))
+                continue
+
+            # Same single-comparison boundary test as the string path
+            if length + para_length > max_chars:
+                append((start, end))
+                # Reopen at the previous paragraph for overlap
+                start = last_start
+                length = last_length
+
+            if not length:
+                start = ps
+            end = pe
+            length += para_length
+            last_start = ps
+            last_length = para_length
+
+        if length:
+            append((start, end))
+        return views
+
+    def _long_paragraph_views(self, text: str, start: int, end: int) -> List[Tuple[int, int]]:
+        """Span twin of _split_long_paragraph, over text[start:end]"""
+        paragraph = text[start:end]
+        views: List[Tuple[int, int]] = []
+        append = views.append
+        max_chars = self.max_chars
+        window_step = max_chars - self.overlap_chars
+        if window_step <= 0:
+            window_step = max_chars
+
+        chunk_start = 0
+        chunk_end = 0
+        length = 0
+        last_start = 0
+        last_length = 0
+
+        for ss, se in _iter_sentence_spans(paragraph):
+            while ss < se and paragraph[ss].isspace():
+                ss += 1
+            while se > ss and paragraph[se - 1].isspace():
+                se -= 1
+            if ss == se:
+                continue
+
+            sentence_length = se - ss
+
+            # Oversized sentences become budget-sized windows, exactly
+            # as in the string path
+            if sentence_length > max_chars:
+                if length:
+                    append((start + chunk_start, start + chunk_end))
+                    length = 0
+                i = ss
+                while True:
+                    append((start + i, start + min(i + max_chars, se)))
+                    if i + max_chars >= se:
+                        break
+                    i += window_step
+                continue
+
+            if length + sentence_length > max_chars:
+                append((start + chunk_start, start + chunk_end))
+                chunk_start = last_start
+                length = last_length
+
+            if not length:
+                chunk_start = ss
+            chunk_end = se
+            length += sentence_length
+            last_start = ss
+            last_length = sentence_length
+
+        if length:
+            append((start + chunk_start, start + chunk_end))
+        return views
+
+    def iter_chunks(self, text: str) -> Iterator[str]:
+        """
+        Lazily yield chunks as they are assembled
+
+        Lets downstream consumers (e.g. LLM submission) start working on
+        the first chunk before the rest of the document is chunked.
+        """
+        # If text fits within limit, yield as single chunk. Comparing
+        # characters against max_chars directly skips the estimator call
+        # (method dispatch + divide) on the common small-document path.
+        if len(text) <= self.max_chars:
             # Silent processing
-            return [text]
-        
+            yield text
+            return
+
         # Otherwise, chunk intelligently
         # Silent processing
-        chunks = self.chunk_by_paragraphs(text)
-        
-        return chunks
+        yield from self._iter_paragraph_chunks(text)
     
     def get_chunk_info(self, chunks: List[str]) -> dict:
         """Get information about chunks"""
+        # One pass: estimate each chunk once (via the cache) and derive
+        # the total from the sizes instead of re-estimating. Bind the
+        # estimator once so the loop avoids per-chunk attribute lookup.
+        estimate = self.estimate_tokens
+        sizes = list(map(estimate, chunks))
         return {
             'num_chunks': len(chunks),
-            'chunk_sizes': [self.estimate_tokens(chunk) for chunk in chunks],
-            'total_tokens': sum(self.estimate_tokens(chunk) for chunk in chunks)
+            'chunk_sizes': sizes,
+            'total_tokens': sum(sizes)
         }
 
 